@@ -1,15 +1,71 @@
 
+import asyncio
 import base64
+import logging
 import os
+from types import MappingProxyType
+from typing import Optional
 
-import requests
+import httpx
 from dotenv import load_dotenv
 
+from mcp.utils import get_stored_token, install_uvloop, json_loads, save_token
+
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 CLIENT_ID = os.getenv("SOUNDCLOUD_CLIENT_ID")
 CLIENT_SECRET = os.getenv("SOUNDCLOUD_CLIENT_SECRET")
 
+if not CLIENT_ID or not CLIENT_SECRET:
+    raise RuntimeError(
+        "SOUNDCLOUD_CLIENT_ID and SOUNDCLOUD_CLIENT_SECRET must be set to request SoundCloud tokens"
+    )
+
+# Base64 encoded "client_id:client_secret" for Basic auth, computed once
+_BASIC_AUTH = "Basic " + base64.b64encode(f"{CLIENT_ID}:{CLIENT_SECRET}".encode("ascii")).decode("ascii")
+
+# Read-only request headers shared by every call to the OAuth endpoint
+_TOKEN_HEADERS = MappingProxyType({
+    "accept": "application/json; charset=utf-8",
+    "Content-Type": "application/x-www-form-urlencoded",
+    "Authorization": _BASIC_AUTH
+})
+_REFRESH_HEADERS = MappingProxyType({
+    "accept": "application/json; charset=utf-8",
+    "Content-Type": "application/x-www-form-urlencoded"
+})
+
+# Pooled client for the OAuth host so token refreshes reuse their connection.
+# Created on first use and again after close_auth_client().
+_AUTH_CLIENT: Optional[httpx.AsyncClient] = None
+
+
+def _get_auth_client() -> httpx.AsyncClient:
+    """
+    Returns the pooled OAuth client, opening a new one if needed.
+    """
+    global _AUTH_CLIENT
+    if _AUTH_CLIENT is None or _AUTH_CLIENT.is_closed:
+        _AUTH_CLIENT = httpx.AsyncClient(
+            base_url="https://secure.soundcloud.com",
+            http2=True,
+            limits=httpx.Limits(max_keepalive_connections=2, keepalive_expiry=300)
+        )
+    return _AUTH_CLIENT
+
+
+async def close_auth_client() -> None:
+    """
+    Closes the pooled OAuth client and its connections.
+
+    Must be awaited on the event loop that made the requests, since pooled
+    connections cannot be reused from another loop.
+    """
+    if _AUTH_CLIENT is not None:
+        await _AUTH_CLIENT.aclose()
+
 # ----- Client Credentials Token Exchange Flow -----
 
 """
@@ -26,48 +82,40 @@ $ curl -X POST "https://secure.soundcloud.com/oauth/token" \
 # The Base64 encoded string of "my_client_id:my_client_secret" is "bXlfY2xpZW50X2lkOm15X2NsaWVudF9zZWNyZXQ="
 """
 
-def get_soundcloud_token_client_credentials() -> str:
+async def get_soundcloud_token_client_credentials() -> str:
     """
     Uses Client Credentials Token Exchange Flow to get an access token.
 
     Note that this is for server-to-server authentication.
 
+    A still valid token from the token file is returned without contacting
+    SoundCloud (SOUNDCLOUD_ACCESS_TOKEN is not consulted); new tokens are
+    persisted to the token file together with their expiry.
+
     See: https://developers.soundcloud.com/docs/api/guide#authentication
         
     Returns:
         str: The access token or None if an error occurred
     """
-    url = "https://secure.soundcloud.com/oauth/token"
-    
-    # Create the Base64 encoded credentials for Basic auth
-    credentials = f"{CLIENT_ID}:{CLIENT_SECRET}"
-    encoded_credentials = base64.b64encode(credentials.encode()).decode()
-
-    headers = {
-        "accept": "application/json; charset=utf-8",
-        "Content-Type": "application/x-www-form-urlencoded",
-        "Authorization": f"Basic {encoded_credentials}"
-    }
+    cached_token = get_stored_token()
+    if cached_token:
+        return cached_token
 
     data = {
         "grant_type": "client_credentials"
     }
 
     try:
-        response = requests.post(url, headers=headers, data=data)
+        response = await _get_auth_client().post("/oauth/token", headers=_TOKEN_HEADERS, data=data)
         response.raise_for_status()
-        print(f"Successfully got soundcloud token: {response.json()}")
-
-        response_json = response.json()
+        response_json = json_loads(response.content)
+        logger.info("Successfully got soundcloud token")
 
-        # TODO add created at time so we can refresh the token if it's expired
-        
-        with open("soundcloud_token.json", "w") as f:
-            json.dump(response_json, f)
+        save_token(response_json)
 
         return response_json["access_token"]
-    except Exception as e:
-        print(f"Error getting soundcloud token: {e}")
+    except (httpx.HTTPError, ValueError, KeyError, OSError) as e:
+        logger.error("Error getting soundcloud token: %s", e)
         return None
     
 
@@ -83,10 +131,12 @@ $ curl -X POST "https://secure.soundcloud.com/oauth/token" \
      --data-urlencode "refresh_token=YOUR_TOKEN" \
 """
 
-def refresh_soundcloud_token(refresh_token: str) -> str:
+async def refresh_soundcloud_token(refresh_token: str) -> str:
     """
     Refreshes the SoundCloud access token using the refresh token.
 
+    The new token (and its rotated refresh token) is persisted to the token file.
+
     See: https://developers.soundcloud.com/docs/api/guide#authentication
         
     Args:
@@ -95,13 +145,6 @@ def refresh_soundcloud_token(refresh_token: str) -> str:
     Returns:
         str: The new access token or None if an error occurred
     """
-    url = "https://secure.soundcloud.com/oauth/token"
-
-    headers = {
-        "accept": "application/json; charset=utf-8",
-        "Content-Type": "application/x-www-form-urlencoded"
-    }
-
     data = {
         "grant_type": "refresh_token",
         "client_id": CLIENT_ID,
@@ -110,17 +153,17 @@ def refresh_soundcloud_token(refresh_token: str) -> str:
     }
 
     try:
-        response = requests.post(url, headers=headers, data=data)
+        response = await _get_auth_client().post("/oauth/token", headers=_REFRESH_HEADERS, data=data)
         response.raise_for_status()
-        return response.json()["access_token"]
-    except Exception as e:
-        print(f"Error refreshing soundcloud token: {e}")
+        response_json = json_loads(response.content)
+        save_token(response_json)
+        return response_json["access_token"]
+    except (httpx.HTTPError, ValueError, KeyError, OSError) as e:
+        logger.error("Error refreshing soundcloud token: %s", e)
         return None
 
 
 if __name__ == "__main__":
-    import json
-
     # test encoding
     test_string = "my_client_id:my_client_secret"
     encoded_string = base64.b64encode(test_string.encode()).decode()
@@ -128,5 +171,12 @@ if __name__ == "__main__":
     print(f"Encoded as expected: {encoded_string}")
 
     # Save the token to a file
-    token = get_soundcloud_token_client_credentials()
+    async def main() -> str:
+        try:
+            return await get_soundcloud_token_client_credentials()
+        finally:
+            await close_auth_client()
+
+    install_uvloop()
+    token = asyncio.run(main())
     print(f"Token: {token}")
\ No newline at end of file
@@ -5,10 +5,9 @@ CLI entry point for the SoundCloud MCP server
 
 import argparse
 import sys
-import os
-from typing import Optional
 
-from mcp.server import create_server
+from mcp.main import run_server
+from mcp.utils import install_uvloop
 
 
 def main() -> int:
@@ -45,16 +44,18 @@ def main() -> int:
     
     args = parser.parse_args()
     
-    # Create the server
-    server = create_server(
-        access_token=args.token,
+    # Use the libuv based event loop for the network heavy SSE transport when available
+    if args.transport == "sse":
+        install_uvloop()
+    
+    # Create and run the server with the specified transport
+    run_server(
+        transport=args.transport,
         port=args.port,
-        host=args.host
+        host=args.host,
+        access_token=args.token
     )
     
-    # Run the server with the specified transport
-    server.run(transport=args.transport)
-    
     return 0
 
 
@@ -1,15 +1,17 @@
+import asyncio
 import json
 import logging
 import os
 import sys
-from typing import Any, Dict, List, Optional
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Union
 
 import httpx
 from dotenv import load_dotenv
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 
 from mcp.server.fastmcp import FastMCP
-from mcp.soundcloud_client import SoundCloudClient
+from mcp.soundcloud_client import SoundCloudClient, get_client
 from mcp.utils import get_access_token, format_track_info
 
 # Load environment variables
@@ -25,17 +27,47 @@ logger = logging.getLogger("soundcloud-mcp")
 
 # Models for parameter validation
 class BPM(BaseModel):
+    model_config = ConfigDict(frozen=True, extra="forbid")
+
     min_bpm: int = Field(..., description="Minimum BPM")
     max_bpm: int = Field(..., description="Maximum BPM")
 
 class Duration(BaseModel):
+    model_config = ConfigDict(frozen=True, extra="forbid")
+
     min_duration: int = Field(..., description="Minimum duration in seconds")
     max_duration: int = Field(..., description="Maximum duration in seconds")
 
 class CreatedAt(BaseModel):
+    model_config = ConfigDict(frozen=True, extra="forbid")
+
     min_created_at: str = Field(..., description="Minimum created date in the format YYYY-MM-DD HH:MM:SS")
     max_created_at: str = Field(..., description="Maximum created date in the format YYYY-MM-DD HH:MM:SS")
 
+# Collections larger than this are formatted in a worker thread so the event
+# loop stays responsive for concurrent tool calls
+FORMAT_IN_THREAD_THRESHOLD = 32
+
+def _format_tracks(tracks: List[Dict[str, Any]]) -> List[str]:
+    """
+    Format a collection of tracks with format_track_info.
+    """
+    formatted_tracks = [None] * len(tracks)
+    for i, track in enumerate(tracks):
+        formatted_tracks[i] = format_track_info(track)
+    return formatted_tracks
+
+async def _close_http_clients(soundcloud_client: Optional[SoundCloudClient]) -> None:
+    """
+    Close the pooled API and OAuth clients on the current event loop.
+    """
+    if soundcloud_client:
+        await soundcloud_client.aclose()
+    # The OAuth client only exists once a token request has imported mcp.auth
+    auth = sys.modules.get("mcp.auth")
+    if auth is not None:
+        await auth.close_auth_client()
+
 def create_server(access_token: Optional[str] = None, **kwargs) -> FastMCP:
     """
     Create and configure a SoundCloud MCP server.
@@ -47,13 +79,32 @@ def create_server(access_token: Optional[str] = None, **kwargs) -> FastMCP:
     Returns:
         Configured FastMCP server
     """
-    # Get SoundCloud token - prioritize passed token, then use utility function
-    user_access_token = access_token or get_access_token()
-    if not user_access_token:
-        logger.error("No SoundCloud access token found. Search functionality will not work.")
+    # Initialize SoundCloud client - prioritize passed token, then use the shared
+    # client for the stored token, which is refreshed as it nears expiry
+    soundcloud_client = None
+    if access_token:
+        soundcloud_client = SoundCloudClient(access_token)
+    else:
+        try:
+            soundcloud_client = get_client()
+        except RuntimeError:
+            logger.error("No SoundCloud access token found. Search functionality will not work.")
 
-    # Initialize SoundCloud client
-    soundcloud_client = SoundCloudClient(user_access_token) if user_access_token else None
+    active_sessions = 0
+
+    @asynccontextmanager
+    async def lifespan(_server: FastMCP) -> AsyncIterator[None]:
+        # Close the pooled connections on the server's own event loop once the
+        # last session ends (SSE runs one per connection). The clients reopen
+        # their pools if another session starts later.
+        nonlocal active_sessions
+        active_sessions += 1
+        try:
+            yield
+        finally:
+            active_sessions -= 1
+            if not active_sessions:
+                await _close_http_clients(soundcloud_client)
 
     # Create MCP server
     server = FastMCP(
@@ -62,32 +113,35 @@ def create_server(access_token: Optional[str] = None, **kwargs) -> FastMCP:
             "Use the search tracks tool to search for tracks on SoundCloud."
         ),
         dependencies=["httpx", "pydantic"],
+        lifespan=lifespan,
         **kwargs
     )
 
     @server.tool()
     async def search_tracks(
         query: Optional[str] = None,
-        genres: Optional[List[str]] = None,
-        tags: Optional[List[str]] = None,
+        genres: Optional[Union[str, List[str]]] = None,
+        tags: Optional[Union[str, List[str]]] = None,
         bpm: Optional[BPM] = None,
         duration: Optional[Duration] = None,
         created_at: Optional[CreatedAt] = None,
         limit: int = 10,
         format_results: bool = True,
+        include_raw: bool = False,
     ) -> Dict[str, Any]:
         """
         Search for tracks on SoundCloud.
 
         Args:
             query (str): The name of the track to search for.
-            genres (List[str]): The genres to search for (ex: Pop, House).
-            tags (List[str]): The tags to search for.
+            genres (Union[str, List[str]]): The genres to search for, as a list or comma separated string (ex: Pop, House).
+            tags (Union[str, List[str]]): The tags to search for, as a list or comma separated string.
             bpm (BPM): The BPM range to search for.
             duration (Duration): The duration range to search for.
             created_at (CreatedAt): The date and time range to search for.
             limit (int): Maximum number of results to return (default: 10)
             format_results (bool): Whether to format results in a human-readable way (default: True)
+            include_raw (bool): Whether to include the raw API response alongside formatted results (default: False)
         """
         if not soundcloud_client:
             return {
@@ -129,37 +183,40 @@ def create_server(access_token: Optional[str] = None, **kwargs) -> FastMCP:
             )
             
             if isinstance(response, dict) and "error" in response:
-                logger.error(f"Error from SoundCloud API: {response['error']}")
+                logger.error("Error from SoundCloud API: %s", response["error"])
                 return response
                 
             # Count tracks found
             track_count = len(response.get("collection", [])) if isinstance(response, dict) else 0
-            logger.info(f"Found {track_count} tracks")
+            logger.info("Found %d tracks", track_count)
             
             # Format the results if requested
             if format_results and track_count > 0:
-                formatted_tracks = []
-                for track in response.get("collection", []):
-                    formatted_tracks.append(format_track_info(track))
+                tracks = response["collection"]
+                if track_count > FORMAT_IN_THREAD_THRESHOLD:
+                    formatted_tracks = await asyncio.to_thread(_format_tracks, tracks)
+                else:
+                    formatted_tracks = _format_tracks(tracks)
                 
-                return {
+                result = {
                     "count": track_count,
-                    "tracks": formatted_tracks,
-                    "raw_data": response
+                    "tracks": formatted_tracks
                 }
+                # The raw response roughly doubles the result size, so only embed it on request
+                if include_raw:
+                    result["raw_data"] = response
+                return result
                 
             return response or {"error": "No results found"}
         
         except Exception as e:
-            logger.error(f"Error searching tracks: {str(e)}")
+            logger.error("Error searching tracks: %s", e)
             return {"error": f"Failed to search tracks: {str(e)}"}
             
     return server
 
 if __name__ == "__main__":
     # For testing directly
-    import asyncio
-    
     # Create and run the server
     server = create_server()
     
@@ -173,6 +230,8 @@ if __name__ == "__main__":
                 print(f"Found {track_count} tracks")
             except Exception as e:
                 print(f"Error testing search: {e}")
+            # Release the pooled connections before this event loop closes
+            await _close_http_clients(get_client())
         
         # Run the test
         asyncio.run(test_search())
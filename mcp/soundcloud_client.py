@@ -1,28 +1,198 @@
-import json
+import asyncio
+import functools
 import logging
-from typing import Any, Dict, List, Optional
+import random
+import time
+import urllib.parse
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple, Union
 
 import httpx
 
+from mcp.utils import get_access_token, get_fresh_access_token, get_stored_token, install_uvloop, json_loads
+
+logger = logging.getLogger(__name__)
+
+# Statuses worth retrying: rate limiting and transient server errors
+RETRYABLE_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
+# Track search endpoint, relative to the client's base_url
+_TRACKS_URL = "tracks"
+
+
+def _param_items(params: Dict[str, Any]) -> Tuple[Tuple[str, str], ...]:
+    """
+    Normalizes query parameters into hashable (name, value) string pairs sorted
+    by name.
+
+    Values are stringified the way httpx does (True -> "true", None -> "") and
+    list or tuple values expand into repeated names, in order.
+
+    Args:
+        params: Query parameters
+
+    Returns:
+        Sorted (name, value) pairs
+    """
+    items = []
+    for name, value in params.items():
+        for item in value if isinstance(value, (list, tuple)) else (value,):
+            if item is True or item is False:
+                item = "true" if item else "false"
+            elif item is None:
+                item = ""
+            items.append((str(name), str(item)))
+    # Sort by name only, so repeated names keep their order
+    items.sort(key=lambda pair: pair[0])
+    return tuple(items)
+
+
+@functools.lru_cache(maxsize=1024)
+def _encode_params(items: Tuple[Tuple[str, str], ...]) -> str:
+    """
+    Percent-encodes query parameters, once per distinct set of parameters.
+
+    The brackets in SoundCloud's range filters (bpm[from], ...) are kept as is.
+
+    Args:
+        items: Sorted (name, value) string pairs, see _param_items
+
+    Returns:
+        Encoded query string
+    """
+    return urllib.parse.urlencode(items, quote_via=urllib.parse.quote, safe="[]")
+
 
 class SoundCloudClient:
     """
     A client for the SoundCloud API.
     """
-    def __init__(self, user_access_token: str):
+    __slots__ = (
+        "user_access_token",
+        "token_provider",
+        "_default_headers",
+        "client",
+        "_cache",
+        "_cache_maxsize",
+        "_cache_ttl",
+        "_inflight",
+        "_semaphore",
+        "__weakref__",
+    )
+
+    API_BASE_URL = "https://api.soundcloud.com"
+    ACCEPT_HEADER = "application/json; charset=utf-8"
+
+    def __init__(
+            self,
+            user_access_token: str,
+            token_provider: Optional[Callable[..., Awaitable[Optional[str]]]] = None,
+            cache_maxsize: int = 1024,
+            cache_ttl: float = 60.0,
+            max_concurrency: int = 20,
+            base_url: str = API_BASE_URL
+    ):
+        """
+        Args:
+            user_access_token: SoundCloud access token
+            token_provider: Optional coroutine function returning a current access
+                token, used to pick up refreshed tokens before each request. It is
+                called with force_refresh=True when the API rejects the token.
+            cache_maxsize: Maximum number of GET responses to keep cached
+            cache_ttl: Number of seconds a cached GET response stays fresh
+            max_concurrency: Maximum number of API requests in flight at once
+            base_url: Base URL that API endpoints are resolved against
+        """
         self.user_access_token = user_access_token
-        self.client = httpx.AsyncClient()
-        self.logger = logging.getLogger(__name__)
-        self.api_base_url = "https://api.soundcloud.com"
+        self.token_provider = token_provider
+        self._default_headers = {
+            "accept": self.ACCEPT_HEADER,
+            "Authorization": f"Bearer {user_access_token}"
+        }
+
+        self.client = self._open_http_client(base_url)
+
+        # LRU cache of successful GET responses, keyed by the endpoint and the
+        # canonical params tuple and holding (expires_at, response), plus the
+        # requests in flight so concurrent identical requests share a single one
+        self._cache: "OrderedDict[tuple, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._cache_maxsize = cache_maxsize
+        self._cache_ttl = cache_ttl
+        self._inflight: Dict[tuple, asyncio.Future] = {}
+
+        # Caps concurrent API requests so a burst of tool calls is queued here
+        # instead of tripping SoundCloud's rate limits
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def __aenter__(self) -> "SoundCloudClient":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        """
+        Closes the pooled HTTP client and its connections.
+
+        Must be awaited on the event loop that made the requests. A new pool is
+        opened if the client is used again afterwards.
+        """
+        await self.client.aclose()
+
+    def _open_http_client(self, base_url: Union[str, httpx.URL]) -> httpx.AsyncClient:
+        """
+        Creates the pooled HTTP client used for API requests.
+
+        Args:
+            base_url: Base URL that API endpoints are resolved against
+        """
+        # One pooled keep-alive client per SoundCloudClient so requests reuse
+        # TCP/TLS connections instead of reconnecting. With HTTP/2 concurrent
+        # requests are multiplexed as streams over a connection, so only a
+        # handful of connections are needed.
+        return httpx.AsyncClient(
+            http2=True,
+            base_url=base_url,
+            headers=self._default_headers,
+            limits=httpx.Limits(
+                max_keepalive_connections=4,
+                max_connections=4,
+                keepalive_expiry=85.0
+            ),
+            timeout=httpx.Timeout(30.0, connect=5.0)
+        )
+
+    def _set_access_token(self, token: str) -> None:
+        """
+        Switches the client to a new access token, updating the default
+        Authorization header in place.
+
+        Args:
+            token: The new access token
+        """
+        self.user_access_token = token
+        self._default_headers["Authorization"] = f"Bearer {token}"
+        self.client.headers["Authorization"] = f"Bearer {token}"
+
+    def _pool_connection_count(self) -> Optional[int]:
+        """
+        Returns the number of connections in the HTTP connection pool, or None
+        if the transport does not expose its pool.
+        """
+        pool = getattr(self.client._transport, "_pool", None)
+        connections = getattr(pool, "connections", None)
+        return len(connections) if connections is not None else None
 
     async def _send_soundcloud_request(
             self,
             endpoint: str,
             method: str = "GET",
-            params: Dict[str, Any] = None
+            params: Optional[Dict[str, Any]] = None
     ) -> Dict[str, Any]:
         """
         Sends a request to the SoundCloud API.
+
+        GET requests are served through the response cache.
         
         Args:
             endpoint: The API endpoint (without the base URL)
@@ -32,38 +202,263 @@ class SoundCloudClient:
         Returns:
             API response as dictionary
         """
-        url = f"{self.api_base_url}/{endpoint.lstrip('/')}"
-        headers = {
-            "accept": "application/json; charset=utf-8",
-            "Authorization": f"Bearer {self.user_access_token}"
-        }
+        if method == "GET":
+            return await self._send_cached_request(endpoint, params)
+        return await self._send_json(endpoint, method, params)
 
-        self.logger.info(f"Sending request to {url} with method {method} and params {params}")
+    async def _send_raw(
+            self,
+            endpoint: str,
+            method: str = "GET",
+            params: Optional[Dict[str, Any]] = None
+    ) -> bytes:
+        """
+        Sends a request to the SoundCloud API and returns the raw response body,
+        bypassing the response cache.
+
+        Useful for passing API responses through without building Python objects.
+        
+        Args:
+            endpoint: The API endpoint (without the base URL)
+            method: HTTP method (GET, POST, etc.)
+            params: Query parameters
+            
+        Returns:
+            Response body as bytes
+
+        Raises:
+            httpx.HTTPStatusError: If the API responds with an error status
+            httpx.TransportError: If the request times out or fails to connect
+        """
+        if self.token_provider:
+            token = await self.token_provider()
+            if token and token != self.user_access_token:
+                self._set_access_token(token)
+
+        # Endpoints are relative and resolved against the client's base_url
+        url = f"{endpoint}?{_encode_params(_param_items(params))}" if params else endpoint
+
+        logger.debug("Sending %s %s", method, url)
+        # Retries back off while holding the slot, so they do not add load
+        async with self._semaphore:
+            response = await self._request_with_retry(method, url)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Open connections in pool: %s", self._pool_connection_count())
+        return response.content
+
+    async def _send_json(
+            self,
+            endpoint: str,
+            method: str = "GET",
+            params: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Sends a request to the SoundCloud API and parses the JSON response,
+        bypassing the response cache.
+        
+        Args:
+            endpoint: The API endpoint (without the base URL)
+            method: HTTP method (GET, POST, etc.)
+            params: Query parameters
+            
+        Returns:
+            API response as dictionary, empty if the response has no body
+        """
         try:
-            response = await self.client.request(
-                method, 
-                url, 
-                headers=headers, 
-                params=params, 
-                timeout=30.0
-            )
-            response.raise_for_status()
-            return response.json()
+            content = await self._send_raw(endpoint, method, params)
+            # Empty bodies (e.g. 204 No Content) have nothing to parse
+            if not content:
+                return {}
+            return json_loads(content)
         except httpx.HTTPStatusError as e:
-            self.logger.error(f"HTTP error: {e.response.status_code} - {e.response.text}")
+            logger.error("HTTP error: %s - %s", e.response.status_code, e.response.text)
             return {"error": f"HTTP error: {e.response.status_code}"}
         except httpx.TimeoutException:
-            self.logger.error("Request timed out")
+            logger.error("Request timed out")
             return {"error": "Request timed out"}
-        except Exception as e:
-            self.logger.error(f"Error sending request: {str(e)}")
+        except httpx.RequestError as e:
+            logger.error("Error sending request: %s", e)
             return {"error": str(e)}
+        except ValueError as e:
+            # json.JSONDecodeError and orjson.JSONDecodeError are both ValueErrors
+            logger.error("Invalid JSON response: %s", e)
+            return {"error": "Invalid JSON response"}
+
+    async def _request_with_retry(
+            self,
+            method: str,
+            url: str,
+            max_attempts: int = 5,
+            base_delay: float = 0.5
+    ) -> httpx.Response:
+        """
+        Sends a request, retrying rate limited, transient server and transport
+        errors with exponential backoff and jitter.
+
+        A Retry-After or X-RateLimit-Reset header from the API overrides the
+        computed delay. When the API rejects the access token, the token is
+        refreshed once through the token provider and the request is repeated.
+
+        Args:
+            method: HTTP method (GET, POST, etc.)
+            url: Request URL including the encoded query, relative to the client's base_url
+            max_attempts: Maximum number of attempts for retryable errors
+            base_delay: Delay in seconds before the first retry
+
+        Returns:
+            The successful response
+
+        Raises:
+            httpx.HTTPStatusError: For non-retryable statuses or once attempts run out
+            httpx.TransportError: Once attempts run out on timeouts or network errors
+        """
+        # The pool is closed when the server shuts down (or an MCP session ends);
+        # reopen it if the client is used again
+        if self.client.is_closed:
+            self.client = self._open_http_client(self.client.base_url)
+
+        # Resolve the httpx method once, using the get/post shortcuts when possible
+        if method == "GET":
+            send = self.client.get
+        elif method == "POST":
+            send = self.client.post
+        else:
+            send = functools.partial(self.client.request, method)
+
+        attempt = 0
+        token_refreshed = False
+        while True:
+            sent_token = self.user_access_token
+            try:
+                response = await send(url)
+                response.raise_for_status()
+                return response
+            except httpx.HTTPStatusError as e:
+                status_code = e.response.status_code
+                if status_code == 401 and self.token_provider and not token_refreshed:
+                    token_refreshed = True
+                    # Another request already switched to a refreshed token
+                    if self.user_access_token != sent_token:
+                        continue
+                    token = await self.token_provider(force_refresh=True)
+                    if token and token != sent_token:
+                        if token != self.user_access_token:
+                            self._set_access_token(token)
+                        continue
+                if status_code not in RETRYABLE_STATUS_CODES or attempt + 1 >= max_attempts:
+                    raise
+                delay = self._retry_delay(attempt, base_delay, e.response)
+            except httpx.TransportError:
+                if attempt + 1 >= max_attempts:
+                    raise
+                delay = self._retry_delay(attempt, base_delay)
+
+            attempt += 1
+            logger.warning(
+                "Retrying request to %s in %.2fs (attempt %d/%d)", url, delay, attempt + 1, max_attempts
+            )
+            await asyncio.sleep(delay)
+
+    @staticmethod
+    def _retry_delay(
+            attempt: int,
+            base_delay: float,
+            response: Optional[httpx.Response] = None
+    ) -> float:
+        """
+        Computes the backoff delay before the next retry, capped at 60 seconds.
+
+        Args:
+            attempt: Zero-based number of the attempt that failed
+            base_delay: Delay in seconds before the first retry
+            response: The failed response, checked for Retry-After and
+                X-RateLimit-Reset headers
+
+        Returns:
+            Delay in seconds
+        """
+        if response is not None:
+            retry_after = response.headers.get("Retry-After")
+            if retry_after:
+                try:
+                    return min(60.0, max(0.0, float(retry_after)))
+                except ValueError:
+                    pass
+
+            # Either seconds until the window resets or the reset time as a Unix timestamp
+            ratelimit_reset = response.headers.get("X-RateLimit-Reset")
+            if ratelimit_reset:
+                try:
+                    reset = float(ratelimit_reset)
+                    if reset > 1_000_000_000:
+                        reset -= time.time()
+                    return min(60.0, max(0.0, reset))
+                except ValueError:
+                    pass
+        return min(60.0, base_delay * 2 ** attempt) + random.uniform(0, 0.2)
+
+    async def _send_cached_request(
+            self,
+            endpoint: str,
+            params: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Sends a GET request, serving fresh responses from the cache and sharing
+        a single request between concurrent callers with the same parameters.
+
+        Error responses are never cached.
+
+        Args:
+            endpoint: The API endpoint (without the base URL)
+            params: Query parameters
+
+        Returns:
+            API response as dictionary
+        """
+        key = (endpoint, *_param_items(params or {}))
+
+        entry = self._cache.get(key)
+        if entry is not None:
+            if entry[0] > time.monotonic():
+                self._cache.move_to_end(key)
+                return entry[1]
+            del self._cache[key]
+
+        # The request runs as its own task so that cancelling one caller (even
+        # the one that started it) does not cancel it for the others
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch_and_cache(key, endpoint, params))
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._inflight_done(key, done))
+        return await asyncio.shield(task)
+
+    async def _fetch_and_cache(
+            self,
+            key: tuple,
+            endpoint: str,
+            params: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Sends a GET request and caches the response unless it is an error."""
+        response = await self._send_json(endpoint, "GET", params)
+        if not (isinstance(response, dict) and "error" in response):
+            self._cache[key] = (time.monotonic() + self._cache_ttl, response)
+            if len(self._cache) > self._cache_maxsize:
+                self._cache.popitem(last=False)
+        return response
+
+    def _inflight_done(self, key: tuple, task: asyncio.Future) -> None:
+        """Forgets a finished in-flight request."""
+        del self._inflight[key]
+        # Mark the exception as retrieved in case every caller was cancelled
+        if not task.cancelled():
+            task.exception()
 
     async def search_tracks(
             self,
             query: Optional[str] = None,
-            genres: Optional[List[str]] = None,
-            tags: Optional[List[str]] = None,
+            genres: Optional[Union[str, List[str]]] = None,
+            tags: Optional[Union[str, List[str]]] = None,
             bpm: Optional[Dict[str, int]] = None,
             duration: Optional[Dict[str, int]] = None,
             created_at: Optional[Dict[str, str]] = None,
@@ -74,8 +469,8 @@ class SoundCloudClient:
 
         Args:
             query: The search query
-            genres: List of genres to filter by
-            tags: List of tags to filter by
+            genres: List of genres to filter by, or an already comma separated string
+            tags: List of tags to filter by, or an already comma separated string
             bpm: Dictionary with "from" and "to" keys for BPM range
             duration: Dictionary with "from" and "to" keys for duration range in seconds
             created_at: Dictionary with "from" and "to" keys for creation date range
@@ -84,73 +479,120 @@ class SoundCloudClient:
         Returns:
             Search results as dictionary
         """
-        params = {}
-        
-        # Only add parameters that are not None
-        if query is not None:
-            params["q"] = query
-            
-        if genres is not None:
-            params["genres"] = ",".join(genres)
-            
-        if tags is not None:
-            params["tags"] = ",".join(tags)
-            
-        if bpm is not None:
-            params["bpm[from]"] = bpm["from"]
-            params["bpm[to]"] = bpm["to"]
-            
-        if duration is not None:
-            params["duration[from]"] = duration["from"]
-            params["duration[to]"] = duration["to"]
-            
-        if created_at is not None:
-            params["created_at[from]"] = created_at["from"]
-            params["created_at[to]"] = created_at["to"]
+        raw_params = {
+            "q": query,
+            # Pre-joined strings are passed through as is
+            "genres": (genres if isinstance(genres, str) else ",".join(genres)) if genres else None,
+            "tags": (tags if isinstance(tags, str) else ",".join(tags)) if tags else None,
+            "bpm[from]": bpm["from"] if bpm else None,
+            "bpm[to]": bpm["to"] if bpm else None,
+            "duration[from]": duration["from"] if duration else None,
+            "duration[to]": duration["to"] if duration else None,
+            "created_at[from]": created_at["from"] if created_at else None,
+            "created_at[to]": created_at["to"] if created_at else None,
+            "limit": limit,
+            # Always add linked_partitioning for pagination support
+            "linked_partitioning": "1",
+        }
 
-        params["limit"] = limit
-        
-        # Always add linked_partitioning for pagination support
-        params["linked_partitioning"] = "1"
+        # Only add parameters that are set
+        params = {key: value for key, value in raw_params.items() if value is not None}
 
-        return await self._send_soundcloud_request("tracks", "GET", params)
+        return await self._send_soundcloud_request(_TRACKS_URL, "GET", params)
+
+    async def iter_tracks(
+            self,
+            max_pages: Optional[int] = None,
+            **kwargs: Any
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Iterate over the tracks of a search across result pages.
+
+        Follows the next_href cursor returned with linked_partitioning. The next
+        page is requested while the tracks of the current page are consumed.
+        Pagination stops early if the API returns an error.
+
+        Args:
+            max_pages: Maximum number of pages to fetch (default: no limit)
+            **kwargs: Search arguments passed to search_tracks
+
+        Yields:
+            Track data from SoundCloud API
+        """
+        page = await self.search_tracks(**kwargs)
+        pages = 1
+        next_page = None
+        try:
+            while True:
+                if "error" in page:
+                    logger.error("Stopping pagination: %s", page["error"])
+                    return
+
+                next_href = page.get("next_href")
+                if next_href and (max_pages is None or pages < max_pages):
+                    # next_href is an absolute URL with the cursor and search params
+                    next_page = asyncio.ensure_future(self._send_soundcloud_request(next_href))
+
+                for track in page.get("collection", []):
+                    yield track
+
+                if next_page is None:
+                    return
+                page = await next_page
+                next_page = None
+                pages += 1
+        finally:
+            if next_page is not None:
+                next_page.cancel()
+
+
+@functools.lru_cache(maxsize=1)
+def get_client() -> SoundCloudClient:
+    """
+    Get the process-wide SoundCloudClient for the stored access token.
+
+    The client is created once, using the token from SOUNDCLOUD_ACCESS_TOKEN or
+    the token file, and refreshes that token as it nears expiry. An expired
+    stored token is still used if a refresh token is stored, since the token
+    provider replaces it before the first request.
+
+    Returns:
+        The shared SoundCloudClient
+
+    Raises:
+        RuntimeError: If no access token is found
+    """
+    user_access_token = get_access_token() or get_stored_token(allow_expired=True)
+    if not user_access_token:
+        raise RuntimeError("No SoundCloud access token found")
+    return SoundCloudClient(user_access_token, token_provider=get_fresh_access_token)
 
 if __name__ == "__main__":
     import asyncio
-    import os
     from dotenv import load_dotenv
     
     # For testing the client directly
     load_dotenv()
     
     async def main():
-        # Get token from environment or file
-        user_access_token = os.getenv("SOUNDCLOUD_ACCESS_TOKEN")
-        if not user_access_token:
-            try:
-                with open("soundcloud_token.json", "r") as f:
-                    soundcloud_token = json.load(f)
-                    user_access_token = soundcloud_token["access_token"]
-            except (FileNotFoundError, json.JSONDecodeError):
-                print("Error: No SoundCloud access token found")
-                return
-                
-        # Create client and run tests
-        client = SoundCloudClient(user_access_token)
-        
-        print("\nTesting search for 'Summertime Blues':")
-        results = await client.search_tracks(query="Summertime Blues")
-        print(f"Found {len(results.get('collection', []))} tracks")
+        # Get the shared client for the token from environment or file
+        try:
+            client = get_client()
+        except RuntimeError as e:
+            print(f"Error: {e}")
+            return
         
-        print("\nTesting search with genre filter:")
-        results = await client.search_tracks(query="Summertime", genres=["House"])
-        print(f"Found {len(results.get('collection', []))} House tracks")
+        # Run the searches concurrently so they share one keep-alive HTTP/2 connection
+        async with client:
+            all_results = await asyncio.gather(
+                client.search_tracks(query="Summertime Blues"),
+                client.search_tracks(query="Summertime", genres=["House"]),
+                client.search_tracks(query="Techno", bpm={"from": 120, "to": 140})
+            )
         
-        print("\nTesting search with BPM range:")
-        results = await client.search_tracks(
-            query="Techno", 
-            bpm={"from": 120, "to": 140}
-        )
-        print(f"Found {len(results.get('collection', []))} Techno tracks with BPM 120-140")
+        searches = ("'Summertime Blues'", "'Summertime' in House", "'Techno' at 120-140 BPM")
+        for search, results in zip(searches, all_results):
+            print(f"Found {len(results.get('collection', []))} tracks for {search}")
     
+    install_uvloop()
     asyncio.run(main())
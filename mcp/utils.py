@@ -2,17 +2,177 @@
 Utility functions for the SoundCloud MCP server.
 """
 
+import asyncio
 import json
 import os
+import sys
+import tempfile
+import threading
+import time
 from typing import Dict, Optional, Any
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+TOKEN_FILE = "soundcloud_token.json"
+
+# Refresh the stored token proactively once it is this close (in seconds) to expiring
+TOKEN_REFRESH_WINDOW = 300.0
+
+# In-process token cache. "expires_at" is on the time.monotonic() clock, "mtime"
+# is the token file modification time the cache was loaded from.
+_TOKEN_CACHE: Dict[str, Any] = {
+    "token": None,
+    "refresh_token": None,
+    "expires_at": 0.0,
+    "mtime": None,
+}
+_TOKEN_LOCK = threading.RLock()
+
+# Only one coroutine refreshes the token at a time: SoundCloud rotates the refresh
+# token, so concurrent refreshes with the same one fail with invalid_grant.
+_REFRESH_LOCK = asyncio.Lock()
+
+# Failed refreshes are not retried before "retry_at" (time.monotonic() clock);
+# the delay doubles with each consecutive failure up to TOKEN_REFRESH_MAX_BACKOFF.
+TOKEN_REFRESH_BACKOFF = 5.0
+TOKEN_REFRESH_MAX_BACKOFF = 300.0
+_REFRESH_STATE: Dict[str, Any] = {"failures": 0, "retry_at": 0.0}
+
+
+def install_uvloop() -> bool:
+    """
+    Use uvloop's libuv based event loop for asyncio when it is available.
+
+    Must be called before the event loop is started.
+
+    Returns:
+        bool: True if uvloop was installed
+    """
+    if sys.platform == "win32":
+        return False
+    try:
+        import uvloop
+    except ImportError:
+        return False
+    uvloop.install()
+    return True
+
+
+def json_loads(data: bytes) -> Any:
+    """
+    Parse JSON, using orjson when it is installed and the stdlib json module otherwise.
+
+    Args:
+        data: JSON document as bytes or str
+
+    Returns:
+        The parsed object
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def json_dumps(obj: Any) -> bytes:
+    """
+    Serialize an object to UTF-8 encoded JSON, using orjson when it is installed
+    and the stdlib json module otherwise.
+
+    Args:
+        obj: Object to serialize
+
+    Returns:
+        JSON document as bytes
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def save_token(token_data: Dict[str, Any]) -> None:
+    """
+    Persist a SoundCloud OAuth token response and update the in-process cache.
+
+    The file is written to a temporary file and moved into place with os.replace
+    so that concurrent server processes never read a partially written token.
+
+    A response without a refresh token keeps the previously stored one.
+
+    Args:
+        token_data: Token response from the SoundCloud OAuth endpoint
+    """
+    expires_in = token_data.get("expires_in")
+    directory = os.path.dirname(os.path.abspath(TOKEN_FILE))
+
+    with _TOKEN_LOCK:
+        _load_token_file()
+        record = {
+            "access_token": token_data.get("access_token"),
+            "refresh_token": token_data.get("refresh_token") or _TOKEN_CACHE["refresh_token"],
+            # Wall clock expiry (with a minute of slack) so it survives restarts
+            "expires_at": time.time() + expires_in - 60 if expires_in else None,
+        }
+
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".soundcloud_token.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(json_dumps(record))
+            os.replace(tmp_path, TOKEN_FILE)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+        _cache_token_record(record, os.stat(TOKEN_FILE).st_mtime)
+
+
+def _cache_token_record(record: Dict[str, Any], mtime: Optional[float]) -> None:
+    """Store a token file record in the in-process cache."""
+    expires_at = record.get("expires_at")
+    _TOKEN_CACHE["token"] = record.get("access_token")
+    _TOKEN_CACHE["refresh_token"] = record.get("refresh_token")
+    # Token files without an expiry (written by older versions) never expire locally
+    _TOKEN_CACHE["expires_at"] = (
+        time.monotonic() + (expires_at - time.time()) if expires_at else float("inf")
+    )
+    _TOKEN_CACHE["mtime"] = mtime
+
+
+def _load_token_file() -> None:
+    """
+    Reload the token file into the cache if it changed since the last read.
+
+    A missing or unreadable token file clears the cached token.
+    """
+    try:
+        mtime = os.stat(TOKEN_FILE).st_mtime
+    except FileNotFoundError:
+        mtime = None
+    if mtime is not None and mtime == _TOKEN_CACHE["mtime"]:
+        return
+
+    record = {}
+    if mtime is not None:
+        try:
+            with open(TOKEN_FILE, "rb") as f:
+                record = json_loads(f.read())
+        except (FileNotFoundError, json.JSONDecodeError):
+            pass
+        if not isinstance(record, dict):
+            record = {}
+    _cache_token_record(record, mtime)
+
 
 def get_access_token() -> Optional[str]:
     """
     Get the SoundCloud access token from environment variable or token file.
+
+    The token file is cached in-process and only re-read when it changes on disk.
     
     Returns:
-        Optional[str]: The access token, or None if not found
+        Optional[str]: The access token, or None if not found or expired
     """
     # Try environment variable first
     token = os.getenv("SOUNDCLOUD_ACCESS_TOKEN")
@@ -20,12 +180,92 @@ def get_access_token() -> Optional[str]:
         return token
     
     # Try token file
-    try:
-        with open("soundcloud_token.json", "r") as f:
-            token_data = json.load(f)
-            return token_data.get("access_token")
-    except (FileNotFoundError, KeyError, json.JSONDecodeError):
-        return None
+    return get_stored_token()
+
+
+def get_stored_token(allow_expired: bool = False) -> Optional[str]:
+    """
+    Get the access token from the token file, ignoring SOUNDCLOUD_ACCESS_TOKEN.
+
+    The token file is cached in-process and only re-read when it changes on disk.
+
+    Args:
+        allow_expired: Also return an expired token, as long as a refresh token
+            is stored to replace it
+
+    Returns:
+        Optional[str]: The stored access token, or None if not found or expired
+    """
+    with _TOKEN_LOCK:
+        _load_token_file()
+        if _TOKEN_CACHE["expires_at"] <= time.monotonic():
+            if not (allow_expired and _TOKEN_CACHE["refresh_token"]):
+                return None
+        return _TOKEN_CACHE["token"]
+
+
+async def get_fresh_access_token(force_refresh: bool = False) -> Optional[str]:
+    """
+    Get the SoundCloud access token, refreshing the stored token when it is about
+    to expire.
+
+    Only tokens from the token file can be refreshed; a token set through
+    SOUNDCLOUD_ACCESS_TOKEN is returned as is. Concurrent callers share a single
+    refresh, and after a failed refresh no new attempt is made until its backoff
+    has passed.
+
+    Args:
+        force_refresh: Refresh the stored token even if it is not about to expire
+        
+    Returns:
+        Optional[str]: The access token, or None if not found or expired
+    """
+    if os.getenv("SOUNDCLOUD_ACCESS_TOKEN"):
+        return get_access_token()
+
+    with _TOKEN_LOCK:
+        _load_token_file()
+        seen_token = _TOKEN_CACHE["token"]
+        if not _needs_refresh(force_refresh):
+            return get_access_token()
+
+    async with _REFRESH_LOCK:
+        with _TOKEN_LOCK:
+            _load_token_file()
+            # Another coroutine (or process) refreshed the token while we waited
+            if _TOKEN_CACHE["token"] != seen_token or not _needs_refresh(force_refresh):
+                return get_access_token()
+            refresh_token = _TOKEN_CACHE["refresh_token"]
+
+        try:
+            from mcp.auth import refresh_soundcloud_token
+        except RuntimeError:
+            # Client credentials are not configured, so the token cannot be
+            # refreshed; back off instead of retrying the import on every request
+            refreshed = None
+        else:
+            # refresh_soundcloud_token persists the new token and updates the cache
+            refreshed = await refresh_soundcloud_token(refresh_token)
+
+        if refreshed:
+            _REFRESH_STATE["failures"] = 0
+        else:
+            delay = min(
+                TOKEN_REFRESH_BACKOFF * 2 ** _REFRESH_STATE["failures"],
+                TOKEN_REFRESH_MAX_BACKOFF,
+            )
+            _REFRESH_STATE["failures"] += 1
+            _REFRESH_STATE["retry_at"] = time.monotonic() + delay
+
+    return get_access_token()
+
+
+def _needs_refresh(force_refresh: bool) -> bool:
+    """Whether the cached token should be refreshed now. Call with _TOKEN_LOCK held."""
+    if not _TOKEN_CACHE["refresh_token"] or time.monotonic() < _REFRESH_STATE["retry_at"]:
+        return False
+    remaining = _TOKEN_CACHE["expires_at"] - time.monotonic()
+    return force_refresh or remaining < TOKEN_REFRESH_WINDOW
 
 
 def format_track_info(track: Dict[str, Any]) -> str:
@@ -41,19 +281,21 @@ def format_track_info(track: Dict[str, Any]) -> str:
     if not track or not isinstance(track, dict):
         return "Invalid track data"
     
-    parts = [
-        f"Title: {track.get('title', 'Unknown')}",
-        f"Artist: {track.get('user', {}).get('username', 'Unknown')}",
-        f"Duration: {format_duration(track.get('duration', 0))}",
+    get = track.get
+    user = get("user") or {}
+    lines = [
+        f"Title: {get('title', 'Unknown')}",
+        f"Artist: {user.get('username', 'Unknown')}",
+        f"Duration: {format_duration(get('duration', 0))}",
     ]
     
-    if "genre" in track and track["genre"]:
-        parts.append(f"Genre: {track['genre']}")
+    if genre := get("genre"):
+        lines.append(f"Genre: {genre}")
     
-    if "permalink_url" in track:
-        parts.append(f"Link: {track['permalink_url']}")
+    if permalink_url := get("permalink_url"):
+        lines.append(f"Link: {permalink_url}")
     
-    return "\n".join(parts)
+    return "\n".join(lines)
 
 
 def format_duration(milliseconds: int) -> str:
@@ -66,7 +308,5 @@ def format_duration(milliseconds: int) -> str:
     Returns:
         Formatted duration as mm:ss
     """
-    seconds = milliseconds // 1000
-    minutes = seconds // 60
-    seconds = seconds % 60
+    minutes, seconds = divmod(milliseconds // 1000, 60)
     return f"{minutes}:{seconds:02d}" 
\ No newline at end of file